@@ -0,0 +1,70 @@
+"""
+Compilation helpers for the numeric kernels of the analysis scripts.
+
+analyze_pair.py and analyze_pair_dev.py run as one short-lived process per
+request, and importing numba plus loading its JIT cache costs more than the
+kernels save. The kernels therefore run as plain Python/NumPy unless
+
+- an ahead-of-time extension built by build_kernels.py is present and was
+  built from the current kernel code (a stale build is ignored with a
+  warning), or
+- ANALYZE_JIT=1 is set and numba is installed, which pays off in
+  long-running processes such as serve.py.
+"""
+import hashlib
+import importlib
+import logging
+import os
+import types
+
+logger = logging.getLogger(__name__)
+
+JIT_ENV_VAR = 'ANALYZE_JIT'
+
+def _no_jit(*args, **kwargs):
+    """Stand-in for numba.njit that leaves the function as plain Python"""
+    if len(args) == 1 and callable(args[0]):
+        return args[0]
+    return lambda func: func
+
+njit = _no_jit
+if os.environ.get(JIT_ENV_VAR) == '1':
+    try:
+        from numba import njit
+    except ImportError:  # numba is optional - run the kernels as plain Python
+        pass
+
+def py_func(kernel):
+    """Plain Python function behind a kernel (unwraps numba dispatchers)"""
+    return getattr(kernel, 'py_func', kernel)
+
+def _hash_code(code, digest):
+    digest.update(code.co_code)
+    digest.update(repr((code.co_names, code.co_varnames)).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _hash_code(const, digest)
+        else:
+            digest.update(repr(const).encode())
+
+def kernel_fingerprint(kernels):
+    """63-bit fingerprint of the kernels' code; the AOT build embeds it to detect stale extensions"""
+    digest = hashlib.sha256()
+    for func in sorted(map(py_func, kernels), key=lambda f: f.__name__):
+        digest.update(func.__name__.encode())
+        _hash_code(func.__code__, digest)
+    return int.from_bytes(digest.digest()[:8], 'little') >> 1
+
+def load_aot(module_name, kernels):
+    """Return kernels swapped for their versions in the AOT extension module_name, if it is current"""
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError:
+        return tuple(kernels)
+
+    built_from = getattr(module, 'kernel_fingerprint', None)  # missing in pre-fingerprint builds
+    if built_from is None or built_from() != kernel_fingerprint(kernels):
+        logger.warning("%s was built from older kernel code and is ignored; "
+                       "rebuild it with python_backend/build_kernels.py", module_name)
+        return tuple(kernels)
+    return tuple(getattr(module, py_func(kernel).__name__) for kernel in kernels)
@@ -0,0 +1,27 @@
+"""
+Numeric kernels for the development analysis script (analyze_pair_dev.py).
+
+Like the kernels in analyze_pair.py they run as plain Python unless the
+_kernels_aot extension built by build_kernels.py is current or ANALYZE_JIT=1
+is set (see _jit.py).
+"""
+import numpy as np
+
+from _jit import njit, load_aot
+
+
+@njit(cache=True)
+def ema(values, period):
+    """Exponential moving average (span=period, seeded with the first value)"""
+    alpha = 2.0 / (period + 1)
+    out = np.empty_like(values)
+    if values.size == 0:
+        return out
+    out[0] = values[0]
+    for i in range(1, values.size):
+        out[i] = alpha * values[i] + (1 - alpha) * out[i - 1]
+    return out
+
+
+# Use the ahead-of-time compiled kernel from build_kernels.py when it is current
+ema, = load_aot('_kernels_aot', (ema,))
@@ -0,0 +1,44 @@
+"""
+JSON encoding and decoding, and the command-line response format, shared by
+analyze_pair.py, analyze_pair_dev.py and the serve.py worker.
+
+Uses orjson when it is installed and the standard json module otherwise.
+"""
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # orjson is optional - fall back to the standard json module
+    orjson = None
+
+def _json_default(value):
+    """Convert numpy scalars for the standard json encoder"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def to_json(payload):
+    """Serialize a response payload to JSON (numpy scalars included)"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(payload, default=_json_default)
+
+def from_json(content):
+    """Decode a JSON document from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+def cli_response(handle, pair, timeframe):
+    """Run handle(pair, timeframe) and return the command-line result as (exit code, stream name, output line)
+
+    Handled failures (an 'error' key) go to stdout with exit code 1, and
+    unexpected exceptions to stderr, which is what the Node backend logs.
+    """
+    try:
+        response = handle(pair, timeframe)
+    except Exception as e:
+        return 1, 'stderr', to_json({'error': f'Analysis failed: {str(e)}'})
+    return (1 if 'error' in response else 0), 'stdout', to_json(response)
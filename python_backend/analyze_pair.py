@@ -1,21 +1,29 @@
 #!/usr/bin/env python3
 import sys
-import json
-import requests
+
+if __name__ == '__main__':
+    # Hand the request to a running serve.py worker when there is one; it has
+    # everything below imported already, so this process can skip the imports
+    import serve
+    serve.run_cli('analyze_pair')
+
 import pandas as pd
 import numpy as np
-import ta
-from ta.momentum import RSIIndicator, StochasticOscillator
-from ta.trend import EMAIndicator, MACD
-from ta.volatility import BollingerBands, KeltnerChannel
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime, timedelta
-import warnings
+from concurrent.futures import ThreadPoolExecutor
 import base64
 import os
-from typing import Tuple, Dict, Any
+import stat
+import threading
+from typing import Tuple, Dict, Any, Optional
 import logging
 
-warnings.filterwarnings('ignore')
+from _jit import njit, load_aot
+from _serialize import to_json, cli_response, from_json
+
+# Skip pandas' SettingWithCopy checks instead of silencing every warning globally
+pd.options.mode.chained_assignment = None
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -23,10 +31,61 @@ logger = logging.getLogger(__name__)
 
 # Constants
 CANDLE_LIMIT = 50
-CHARTS_DIR = "/tmp/charts"
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+# Per-user private directory - the cache must not be one another local user can plant or swap
+HTTP_CACHE_DIR = os.path.join("/tmp", f"cg_cache-{os.getuid()}")
+HTTP_CACHE_PATH = os.path.join(HTTP_CACHE_DIR, "http")
+HTTP_CACHE_TTL = 60  # seconds
+MAX_RESPONSE_BYTES = 2 * 1024 * 1024  # CoinGecko payloads are a few KB; reject anything unreasonable
+
+# Shared HTTP session, created on first use so requests is only imported when needed
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+def _is_own_dir(path):
+    """Check that path is a directory owned by this user (not planted in the shared dir)"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid()
+
+def _cached_session():
+    """Session with a short-lived response cache, or None when requests-cache or the cache dir is unavailable"""
+    try:
+        import requests_cache  # optional (pip install requests-cache), not part of the locked dependencies
+    except ImportError:
+        return None
+
+    try:
+        os.mkdir(HTTP_CACHE_DIR, 0o700)
+    except OSError:
+        pass  # Already there (checked below) or not creatable
+    if not _is_own_dir(HTTP_CACHE_DIR):
+        logger.warning(f"Not caching HTTP responses: {HTTP_CACHE_DIR} is not a directory owned by this user")
+        return None
+
+    # JSON rather than the default pickle serializer, so a tampered cache can't run code
+    return requests_cache.CachedSession(
+        HTTP_CACHE_PATH,
+        backend='sqlite',
+        serializer='json',
+        expire_after=HTTP_CACHE_TTL,
+        allowable_methods=('GET',)
+    )
 
-# Create charts directory if it doesn't exist
-os.makedirs(CHARTS_DIR, exist_ok=True)
+def _get_session():
+    """Get the shared HTTP session (keep-alive, short-lived response cache)"""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = _cached_session()
+            if session is None:  # fall back to a plain keep-alive session
+                import requests
+                session = requests.Session()
+            session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+            _SESSION = session
+        return _SESSION
 
 # CoinGecko ID mapping for common trading pairs
 PAIR_TO_COINGECKO_ID = {
@@ -53,98 +112,177 @@ PAIR_TO_COINGECKO_ID = {
     'WIFUSDT': 'dogwifcoin',
 }
 
-def calculate_rsi(df: pd.DataFrame, period: int = 14) -> pd.Series:
-    """Calculate RSI indicator"""
-    return ta.momentum.RSIIndicator(df['Close'], window=period).rsi()
-
-def calculate_stochastic(df: pd.DataFrame, k_period: int = 14, d_period: int = 3) -> Tuple[pd.Series, pd.Series]:
-    """Calculate Stochastic oscillator"""
-    stoch = ta.momentum.StochasticOscillator(
-        high=df['High'], 
-        low=df['Low'], 
-        close=df['Close'],
-        window=k_period,
-        smooth_window=d_period
-    )
-    return stoch.stoch(), stoch.stoch_signal()
+# Common mappings for meme coins and others, keyed by base currency
+SPECIAL_MAPPINGS = {
+    'pepe': 'pepe',
+    'shib': 'shiba-inu',
+    'doge': 'dogecoin',
+    'floki': 'floki',
+    'bonk': 'bonk',
+    'wif': 'dogwifcoin',
+    'btc': 'bitcoin',
+    'eth': 'ethereum',
+    'ada': 'cardano',
+    'dot': 'polkadot',
+    'link': 'chainlink',
+    'bnb': 'binancecoin',
+    'sol': 'solana',
+    'matic': 'polygon',
+    'avax': 'avalanche-2',
+    'ltc': 'litecoin',
+    'xrp': 'ripple',
+    'atom': 'cosmos',
+    'algo': 'algorand',
+    'vet': 'vechain',
+    'fil': 'filecoin',
+}
+
+# Single lookup table for full trading pair symbols (direct mappings take precedence)
+_COINGECKO_LOOKUP = {
+    **{f"{base.upper()}USDT": coin_id for base, coin_id in SPECIAL_MAPPINGS.items()},
+    **PAIR_TO_COINGECKO_ID,
+}
+
+@njit(cache=True)
+def _rsi_last(close, period):
+    """Last RSI value (Wilder's smoothing, same as ta.momentum.RSIIndicator)"""
+    if close.size < period:
+        return np.nan
+    alpha = 1.0 / period
+    # ta seeds both averages with a zero move for the first bar
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, close.size):
+        delta = close[i] - close[i - 1]
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        avg_gain = (1 - alpha) * avg_gain + alpha * gain
+        avg_loss = (1 - alpha) * avg_loss + alpha * loss
+    if avg_loss == 0:
+        return 100.0
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+@njit(cache=True)
+def _stoch_last(high, low, close, k_period):
+    """Last Stochastic %K value (same as ta.momentum.StochasticOscillator.stoch)"""
+    if close.size < k_period:
+        return np.nan
+    lowest = low[-k_period:].min()
+    highest = high[-k_period:].max()
+    if highest == lowest:
+        return np.nan
+    return 100.0 * (close[-1] - lowest) / (highest - lowest)
+
+@njit(cache=True)
+def _ewm(values, alpha):
+    """Exponentially weighted mean with adjust=False, seeded with the first value"""
+    out = np.empty_like(values)
+    out[0] = values[0]
+    for i in range(1, values.size):
+        out[i] = (1 - alpha) * out[i - 1] + alpha * values[i]
+    return out
+
+@njit(cache=True)
+def _keltner_last(high, low, close, period):
+    """Last Keltner Channel bands (ta's original version: SMA of typical prices)"""
+    start = max(0, close.size - period)
+    upper = 0.0
+    basis = 0.0
+    lower = 0.0
+    for i in range(start, close.size):
+        upper += (4 * high[i] - 2 * low[i] + close[i]) / 3.0
+        basis += (high[i] + low[i] + close[i]) / 3.0
+        lower += (-2 * high[i] + 4 * low[i] + close[i]) / 3.0
+    count = close.size - start
+    if count == 0:
+        return np.nan, np.nan, np.nan
+    # The middle band needs a full window, the outer bands use what is available
+    basis = basis / count if count == period else np.nan
+    return upper / count, basis, lower / count
+
+# Use the ahead-of-time compiled kernels from build_kernels.py when they are current
+_rsi_last, _stoch_last, _ewm, _keltner_last = load_aot(
+    '_indicators_aot', (_rsi_last, _stoch_last, _ewm, _keltner_last))
+
+def compute_indicators(close: np.ndarray, high: np.ndarray, low: np.ndarray, rsi_period: int = 14,
+                       k_period: int = 14, d_period: int = 3, kc_period: int = 20) -> Dict[str, float]:
+    """Calculate RSI, Stochastic, EMA and Keltner values in a single pass over the price arrays"""
+    data_length = close.size
+    current_price = float(close[-1])
+    indicators = {}
+
+    # RSI (last two values) - Wilder's smoothing, first bar counts as a zero move
+    rsi = np.full(2, np.nan)
+    if data_length >= rsi_period + 1:
+        delta = np.diff(close, prepend=close[0])
+        avg_gain = _ewm(np.maximum(delta, 0.0), 1.0 / rsi_period)[-2:]
+        avg_loss = _ewm(np.maximum(-delta, 0.0), 1.0 / rsi_period)[-2:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    indicators['rsi'], indicators['rsi_prev'] = float(rsi[-1]), float(rsi[-2])
+
+    # Stochastic %K (last d_period values) and %D (their mean)
+    stoch_k = np.full(d_period, np.nan)
+    tail = k_period + d_period - 1
+    if data_length >= tail:
+        lowest = sliding_window_view(low[-tail:], k_period).min(axis=1)
+        highest = sliding_window_view(high[-tail:], k_period).max(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stoch_k = 100 * (close[-d_period:] - lowest) / (highest - lowest)
+    indicators['stoch_k'], indicators['stoch_k_prev'] = float(stoch_k[-1]), float(stoch_k[-2])
+    indicators['stoch_d'] = float(stoch_k.mean())
 
-def calculate_ema(df: pd.DataFrame, interval: str = '1h') -> Dict[str, float]:
-    """Calculate EMA indicators"""
     try:
-        # Use shorter periods if we don't have enough data
-        data_length = len(df)
-        ema100_period = min(100, max(10, data_length // 3))
-        ema200_period = min(200, max(20, data_length // 2))
-        
-        ema100 = ta.trend.EMAIndicator(df['Close'], window=ema100_period).ema_indicator()
-        ema200 = ta.trend.EMAIndicator(df['Close'], window=ema200_period).ema_indicator()
-        
-        ema100_val = float(ema100.iloc[-1]) if len(ema100) > 0 and pd.notna(ema100.iloc[-1]) else float(df['Close'].iloc[-1])
-        ema200_val = float(ema200.iloc[-1]) if len(ema200) > 0 and pd.notna(ema200.iloc[-1]) else float(df['Close'].iloc[-1])
-        
-        # Ensure we have valid values
-        if ema100_val == 0:
-            ema100_val = float(df['Close'].iloc[-1])
-        if ema200_val == 0:
-            ema200_val = float(df['Close'].iloc[-1])
-        
-        return {
-            'ema100': ema100_val,
-            'ema200': ema200_val
-        }
+        # EMA - use shorter periods if we don't have enough data
+        for key, period in (('ema100', min(100, max(10, data_length // 3))),
+                            ('ema200', min(200, max(20, data_length // 2)))):
+            value = float(_ewm(close, 2.0 / (period + 1))[-1]) if data_length >= period else np.nan
+            # Ensure we have valid values
+            indicators[key] = current_price if np.isnan(value) or value == 0 else value
     except Exception as e:
         logger.error(f"Error calculating EMA: {e}")
         # Fallback to current price
-        current_price = float(df['Close'].iloc[-1])
-        return {'ema100': current_price, 'ema200': current_price}
+        indicators['ema100'] = indicators['ema200'] = current_price
 
-def calculate_keltner_channels(df: pd.DataFrame, period: int = 20, multiplier: float = 2.0) -> Tuple[float, float, float]:
-    """Calculate Keltner Channels"""
     try:
+        # Keltner Channels (ta's original version: SMA of typical prices)
         # Use shorter period if we don't have enough data
-        actual_period = min(period, max(5, len(df) // 3))
-        
-        kc = ta.volatility.KeltnerChannel(df['High'], df['Low'], df['Close'], window=actual_period, window_atr=actual_period)
-        upper = kc.keltner_channel_hband().iloc[-1] if len(kc.keltner_channel_hband()) > 0 else 0
-        basis = kc.keltner_channel_mband().iloc[-1] if len(kc.keltner_channel_mband()) > 0 else 0
-        lower = kc.keltner_channel_lband().iloc[-1] if len(kc.keltner_channel_lband()) > 0 else 0
-        
+        actual_period = min(kc_period, max(5, data_length // 3))
+        upper, basis, lower = _keltner_last(high, low, close, actual_period)
+
         # If any value is invalid, use simple calculation based on current price
-        current_price = float(df['Close'].iloc[-1])
-        if upper == 0 or pd.isna(upper):
-            upper = current_price * 1.02
-        if basis == 0 or pd.isna(basis):
-            basis = current_price
-        if lower == 0 or pd.isna(lower):
-            lower = current_price * 0.98
-        
-        return float(upper), float(basis), float(lower)
+        indicators['kc_upper'] = current_price * 1.02 if upper == 0 or np.isnan(upper) else float(upper)
+        indicators['kc_basis'] = current_price if basis == 0 or np.isnan(basis) else float(basis)
+        indicators['kc_lower'] = current_price * 0.98 if lower == 0 or np.isnan(lower) else float(lower)
     except Exception as e:
         logger.error(f"Error calculating Keltner Channels: {e}")
-        current_price = float(df['Close'].iloc[-1]) if len(df) > 0 else 100.0
-        return current_price * 1.02, current_price, current_price * 0.98
+        indicators['kc_upper'] = current_price * 1.02
+        indicators['kc_basis'] = current_price
+        indicators['kc_lower'] = current_price * 0.98
 
-def detect_support_resistance_zones(df: pd.DataFrame, lookback: int = 20) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+    return indicators
+
+def detect_support_resistance_zones(close: np.ndarray, high: np.ndarray, low: np.ndarray,
+                                    lookback: int = 20) -> Tuple[Tuple[float, float], Tuple[float, float]]:
     """Detect support and resistance zones"""
     try:
-        if len(df) < lookback:
-            current_price = float(df['Close'].iloc[-1])
+        if close.size < lookback:
+            current_price = float(close[-1])
             return (current_price * 0.95, current_price * 0.98), (current_price * 1.02, current_price * 1.05)
         
-        # Find local minima and maxima
-        highs = df['High'].rolling(window=lookback).max()
-        lows = df['Low'].rolling(window=lookback).min()
+        # Find local minima and maxima over the last `lookback` rolling windows only
+        tail = 2 * lookback - 1
+        highs = sliding_window_view(high[-tail:], lookback).max(axis=1)
+        lows = sliding_window_view(low[-tail:], lookback).min(axis=1)
         
         # Recent resistance and support levels
-        resistance_high = float(highs.iloc[-lookback:].max())
-        resistance_low = float(highs.iloc[-lookback:].quantile(0.8))
-        support_high = float(lows.iloc[-lookback:].quantile(0.2))
-        support_low = float(lows.iloc[-lookback:].min())
+        resistance_low, resistance_high = (float(v) for v in np.quantile(highs, [0.8, 1.0]))
+        support_low, support_high = (float(v) for v in np.quantile(lows, [0.0, 0.2]))
         
         return (support_low, support_high), (resistance_low, resistance_high)
     except Exception as e:
         logger.error(f"Error detecting support/resistance: {e}")
-        current_price = float(df['Close'].iloc[-1])
+        current_price = float(close[-1])
         return (current_price * 0.95, current_price * 0.98), (current_price * 1.02, current_price * 1.05)
 
 def fetch_current_price(symbol: str) -> float:
@@ -152,107 +290,82 @@ def fetch_current_price(symbol: str) -> float:
     # This is a placeholder - in the real implementation this would fetch from an API
     return None
 
-def forecast_prices(df: pd.DataFrame, periods: int = 30) -> pd.DataFrame:
-    """Prophet price forecasting - simplified version"""
+def forecast_bounds(close: np.ndarray, periods: int = 30) -> Optional[Dict[str, float]]:
+    """Prophet price forecasting - simplified version, returns the forecast summary values"""
     try:
         # Simple trend-based forecast as fallback
-        if len(df) < 10:
+        if close.size < 10:
             return None
         
         # Calculate trend
-        recent_prices = df['Close'].tail(10)
-        trend = (recent_prices.iloc[-1] - recent_prices.iloc[0]) / len(recent_prices)
-        
-        # Create simple forecast
-        forecast_data = []
-        last_price = float(recent_prices.iloc[-1])
+        recent_prices = close[-10:]
+        trend = (recent_prices[-1] - recent_prices[0]) / recent_prices.size
+        last_price = float(recent_prices[-1])
         
-        for i in range(periods):
-            forecast_price = last_price + trend * (i + 1)
-            forecast_data.append({
-                'yhat': forecast_price,
-                'yhat_lower': forecast_price * 0.95,
-                'yhat_upper': forecast_price * 1.05
-            })
+        # The forecast is linear (last_price + trend * i for i in 1..periods), so its
+        # quantiles interpolate between the endpoints and min/max are the endpoints
+        first, final = last_price + trend, last_price + trend * periods
+        lowest, highest = min(first, final), max(first, final)
         
-        return pd.DataFrame(forecast_data)
+        return {
+            'yhat_q25': float(lowest + 0.25 * (highest - lowest)),
+            'yhat_q75': float(lowest + 0.75 * (highest - lowest)),
+            'yhat_lower_min': float(lowest * 0.95),
+            'yhat_upper_max': float(highest * 1.05)
+        }
     except Exception as e:
         logger.error(f"Error in price forecasting: {e}")
         return None
 
 def format_price(price: float, reference_price: float) -> str:
     """Format price for display"""
-    try:
-        if price == 0 or pd.isna(price):
-            return "N/A"
-        return f"${price:.4f}" if price < 100 else f"${price:.2f}"
-    except:
+    # Non-numeric placeholders (e.g. "N/A" targets), NaN (x != x) and zero aren't displayable
+    if not isinstance(price, (int, float, np.number)) or price != price or price == 0:
         return "N/A"
+    return f"${price:.4f}" if price < 100 else f"${price:.2f}"
 
 def format_strategy_number(value: float) -> str:
     """Format numbers for strategy display"""
-    try:
-        if pd.isna(value):
-            return "N/A"
-        return f"{value:.2f}"
-    except:
+    if value is None or value != value:
         return "N/A"
+    return f"{value:.2f}"
 
-def generate_chart_snapshot(df: pd.DataFrame, symbol: str, save_path: str) -> bool:
-    """Generate chart snapshot - simplified version"""
+def generate_chart_snapshot(df: pd.DataFrame, symbol: str) -> Optional[bytes]:
+    """Generate chart snapshot image bytes - simplified version"""
     try:
-        # For now, just create a placeholder file
-        # In a full implementation, this would generate actual charts
-        with open(save_path, 'w') as f:
-            f.write("Chart placeholder")
-        return True
+        # For now, just return placeholder content
+        # In a full implementation, this would render actual charts
+        return b"Chart placeholder"
     except Exception as e:
         logger.error(f"Error generating chart: {e}")
-        return False
+        return None
+
+# Translation table for escape_markdown (single pass over the text)
+_MARKDOWN_ESCAPES = str.maketrans({'*': '\\*', '_': '\\_', '`': '\\`'})
 
 def escape_markdown(text: str) -> str:
     """Escape markdown characters"""
-    return text.replace('*', '\\*').replace('_', '\\_').replace('`', '\\`')
+    return text.translate(_MARKDOWN_ESCAPES)
 
 def get_coingecko_id(symbol: str):
     """Convert trading pair symbol to CoinGecko ID"""
-    # Try direct mapping first
-    if symbol in PAIR_TO_COINGECKO_ID:
-        return PAIR_TO_COINGECKO_ID[symbol]
+    coin_id = _COINGECKO_LOOKUP.get(symbol)
+    if coin_id is not None:
+        return coin_id
     
-    # Try to extract base currency and convert to lowercase
+    # Fall back to the lowercase base currency
     if symbol.endswith('USDT'):
-        base_currency = symbol[:-4].lower()
-        
-        # Common mappings for meme coins and others
-        special_mappings = {
-            'pepe': 'pepe',
-            'shib': 'shiba-inu',
-            'doge': 'dogecoin',
-            'floki': 'floki',
-            'bonk': 'bonk',
-            'wif': 'dogwifcoin',
-            'btc': 'bitcoin',
-            'eth': 'ethereum',
-            'ada': 'cardano',
-            'dot': 'polkadot',
-            'link': 'chainlink',
-            'bnb': 'binancecoin',
-            'sol': 'solana',
-            'matic': 'polygon',
-            'avax': 'avalanche-2',
-            'ltc': 'litecoin',
-            'xrp': 'ripple',
-            'atom': 'cosmos',
-            'algo': 'algorand',
-            'vet': 'vechain',
-            'fil': 'filecoin',
-        }
-        
-        return special_mappings.get(base_currency, base_currency)
+        return symbol[:-4].lower()
     
     return symbol.lower()
 
+def _parse_json_response(response) -> Any:
+    """Decode a CoinGecko JSON response body"""
+    content = response.content
+    if len(content) > MAX_RESPONSE_BYTES:
+        raise ValueError(f"Response too large ({len(content)} bytes)")
+    return from_json(content)
+
 def get_coingecko_market_data(coin_id: str, days: int = 7):
     """Fetch market chart data from CoinGecko and convert to OHLC"""
     try:
@@ -263,10 +376,10 @@ def get_coingecko_market_data(coin_id: str, days: int = 7):
             # Automatic interval based on days parameter (CoinGecko free plan)
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = _get_session().get(url, params=params, timeout=10)
         response.raise_for_status()
         
-        data = response.json()
+        data = _parse_json_response(response)
         
         if 'prices' not in data or not data['prices']:
             return None
@@ -277,43 +390,30 @@ def get_coingecko_market_data(coin_id: str, days: int = 7):
         if len(prices_df) < 50:
             return None
         
-        # Convert timestamp to datetime
-        prices_df['timestamp'] = pd.to_datetime(prices_df['timestamp'], unit='ms')
-        
-        # Create OHLC data by grouping hourly prices
+        # Create OHLC data from consecutive prices
         # Since we only have price data, we'll simulate OHLC by using price movements
-        df_list = []
-        for i in range(len(prices_df)):
-            if i == 0:
-                open_price = prices_df.iloc[i]['price']
-                high_price = prices_df.iloc[i]['price']
-                low_price = prices_df.iloc[i]['price']
-                close_price = prices_df.iloc[i]['price']
-            else:
-                # Use previous close as open
-                open_price = df_list[-1]['Close'] if df_list else prices_df.iloc[i-1]['price']
-                close_price = prices_df.iloc[i]['price']
-                
-                # Simulate high/low based on price movement
-                price_change = abs(close_price - open_price)
-                volatility_factor = price_change * 0.1  # Small volatility simulation
-                
-                high_price = max(open_price, close_price) + volatility_factor
-                low_price = min(open_price, close_price) - volatility_factor
-            
-            df_list.append({
-                'timestamp': prices_df.iloc[i]['timestamp'],
-                'Open': open_price,
-                'High': high_price,
-                'Low': low_price,
-                'Close': close_price,
-                'Volume': 1000000  # Placeholder volume
-            })
-        
-        df = pd.DataFrame(df_list)
-        df.set_index('timestamp', inplace=True)
-        
-        return df[['Open', 'High', 'Low', 'Close', 'Volume']]
+        close_prices = prices_df['price'].to_numpy(dtype=np.float64)
+
+        # Use previous close as open (first candle opens at its own close)
+        open_prices = np.empty_like(close_prices)
+        open_prices[0] = close_prices[0]
+        open_prices[1:] = close_prices[:-1]
+
+        # Simulate high/low based on price movement
+        volatility_factor = np.abs(close_prices - open_prices) * 0.1  # Small volatility simulation
+        high_prices = np.maximum(open_prices, close_prices) + volatility_factor
+        low_prices = np.minimum(open_prices, close_prices) - volatility_factor
+
+        # Timestamps aren't used downstream, so keep the default RangeIndex
+        df = pd.DataFrame({
+            'Open': open_prices,
+            'High': high_prices,
+            'Low': low_prices,
+            'Close': close_prices,
+            'Volume': 1000000  # Placeholder volume
+        })
+
+        return df
         
     except Exception as e:
         print(f"Error fetching CoinGecko market data for {coin_id}: {e}", file=sys.stderr)
@@ -329,10 +429,10 @@ def get_current_price_data(coin_id: str):
             'include_24hr_change': 'true'
         }
         
-        response = requests.get(url, params=params, timeout=5)
+        response = _get_session().get(url, params=params, timeout=5)
         response.raise_for_status()
         
-        data = response.json()
+        data = _parse_json_response(response)
         
         if coin_id in data:
             return {
@@ -354,47 +454,53 @@ def run_strategy(df: pd.DataFrame) -> Tuple[Dict[str, Any], bool]:
     
     logger.info("Running strategy indicators...")
     
+    # Convert OHLCV once; each row is a contiguous price series reused below
+    ohlcv = np.ascontiguousarray(df[OHLCV_COLUMNS].to_numpy(dtype=np.float64).T)
+    close, high, low = ohlcv[3], ohlcv[1], ohlcv[2]
+    
     # Calculate technical indicators
-    rsi = calculate_rsi(df)
-    stoch_k, stoch_d = calculate_stochastic(df)
-    emas = calculate_ema(df, interval='1h')
+    indicators = compute_indicators(close, high, low)
     
-    if emas is None or emas['ema100'] == 0 or emas['ema200'] == 0:
+    if indicators['ema100'] == 0 or indicators['ema200'] == 0:
         return {"signal": "NO SIGNAL", "tp": 0, "sl": 0, "chart_base64": "", "snapshot": "Error: Invalid EMA data"}, False
     
-    upper_kc, basis_kc, lower_kc = calculate_keltner_channels(df)
+    upper_kc, basis_kc, lower_kc = indicators['kc_upper'], indicators['kc_basis'], indicators['kc_lower']
     if upper_kc == 0 or lower_kc == 0:
         return {"signal": "NO SIGNAL", "tp": 0, "sl": 0, "chart_base64": "", "snapshot": "Error: Invalid Keltner data"}, False
     
-    support_zone, resistance_zone = detect_support_resistance_zones(df)
-    current_price = fetch_current_price(df.name) or df['Close'].iloc[-1]
+    rsi_last, rsi_prev = indicators['rsi'], indicators['rsi_prev']
+    stoch_k_last, stoch_k_prev = indicators['stoch_k'], indicators['stoch_k_prev']
+    stoch_d_last = indicators['stoch_d']
+    
+    support_zone, resistance_zone = detect_support_resistance_zones(close, high, low)
+    current_price = fetch_current_price(df.name) or close[-1]
     
     # Volume analysis removed - no longer needed
     
     # Signal conditions
-    rsi_crossover = rsi.iloc[-1] > 50 and rsi.iloc[-2] <= 50
-    rsi_crossunder = rsi.iloc[-1] < 50 and rsi.iloc[-2] >= 50
-    stoch_crossover = stoch_k.iloc[-1] > 20 and stoch_k.iloc[-2] <= 20
-    stoch_crossunder = stoch_k.iloc[-1] < 80 and stoch_k.iloc[-2] >= 80
+    rsi_crossover = rsi_last > 50 and rsi_prev <= 50
+    rsi_crossunder = rsi_last < 50 and rsi_prev >= 50
+    stoch_crossover = stoch_k_last > 20 and stoch_k_prev <= 20
+    stoch_crossunder = stoch_k_last < 80 and stoch_k_prev >= 80
     
     # Bullish/Bearish conditions (loosened criteria)
-    bullish_rsi = rsi_crossover or rsi.iloc[-1] > 52  # Lowered from 56
-    bearish_rsi = rsi_crossunder or rsi.iloc[-1] < 48  # Raised from 46
-    bullish_stoch = stoch_k.iloc[-1] > 20 and (stoch_crossover or stoch_k.iloc[-1] > 45)  # Lowered from 50
-    bearish_stoch = stoch_k.iloc[-1] < 80 and (stoch_crossunder or stoch_k.iloc[-1] < 55)  # Raised from 50
+    bullish_rsi = rsi_crossover or rsi_last > 52  # Lowered from 56
+    bearish_rsi = rsi_crossunder or rsi_last < 48  # Raised from 46
+    bullish_stoch = stoch_k_last > 20 and (stoch_crossover or stoch_k_last > 45)  # Lowered from 50
+    bearish_stoch = stoch_k_last < 80 and (stoch_crossunder or stoch_k_last < 55)  # Raised from 50
     bullish_price = current_price > basis_kc * 1.001  # More lenient than upper Keltner
     bearish_price = current_price < basis_kc * 0.999  # More lenient than lower Keltner
-    bullish_ema = emas['ema100'] > emas['ema200'] * 1.001  # EMA100 above EMA200 by 0.1%
-    bearish_ema = emas['ema100'] < emas['ema200'] * 0.999  # EMA100 below EMA200 by 0.1%
+    bullish_ema = indicators['ema100'] > indicators['ema200'] * 1.001  # EMA100 above EMA200 by 0.1%
+    bearish_ema = indicators['ema100'] < indicators['ema200'] * 0.999  # EMA100 below EMA200 by 0.1%
     
     # Additional momentum indicators for better distribution
-    price_momentum = (current_price - df['Close'].iloc[-20]) / df['Close'].iloc[-20] * 100  # 20-period momentum
+    price_momentum = (current_price - close[-20]) / close[-20] * 100  # 20-period momentum
     bullish_momentum = price_momentum > 1.0  # Positive 20-period momentum
     bearish_momentum = price_momentum < -1.0  # Negative 20-period momentum
     
     # Overbought/Oversold conditions
-    not_overbought = rsi.iloc[-1] < 70 and stoch_k.iloc[-1] < 80
-    not_oversold = rsi.iloc[-1] > 30 and stoch_k.iloc[-1] > 20
+    not_overbought = rsi_last < 70 and stoch_k_last < 80
+    not_oversold = rsi_last > 30 and stoch_k_last > 20
     
     # Score calculation (6 indicators now for better distribution)
     bullish_points = sum([bullish_rsi, bullish_stoch, bullish_price, bullish_ema, bullish_momentum])
@@ -426,34 +532,34 @@ def run_strategy(df: pd.DataFrame) -> Tuple[Dict[str, Any], bool]:
         sl = max(resistance_zone[1], current_price * 1.02)
         tp = min(support_zone[0], current_price * 0.98)
     
-    # Prophet forecast integration
+    # Forecast integration, risk-reward adjustment and price formatting for actual signals
+    sl_str = tp_str = "N/A"
     if signal_type != "NO SIGNAL":
-        forecast = forecast_prices(df, periods=30)
+        # SL always sits behind and TP ahead of the current price, so signed distances
+        # in the trade direction replace abs()
+        direction = 1 if signal_type == "BUY" else -1
+        
+        # Prophet forecast integration
+        forecast = forecast_bounds(close, periods=30)
         if forecast is not None:
-            forecast_tp = float(forecast['yhat'].quantile(0.75)) if signal_type == "BUY" else float(forecast['yhat'].quantile(0.25))
-            forecast_sl = float(forecast['yhat_lower'].min()) if signal_type == "BUY" else float(forecast['yhat_upper'].max())
-            
-            if signal_type == "BUY":
-                sl = min(forecast_sl, support_zone[0], current_price * 0.98)
-                tp = max(forecast_tp, resistance_zone[1], current_price * 1.02)
+            if direction > 0:
+                sl = min(forecast['yhat_lower_min'], support_zone[0], current_price * 0.98)
+                tp = max(forecast['yhat_q75'], resistance_zone[1], current_price * 1.02)
             else:
-                sl = max(forecast_sl, resistance_zone[1], current_price * 1.02)
-                tp = min(forecast_tp, support_zone[0], current_price * 0.98)
-    
-    # Risk-reward ratio adjustment
-    if signal_type != "NO SIGNAL":
-        risk = abs(current_price - sl)
-        reward = abs(tp - current_price)
+                sl = max(forecast['yhat_upper_max'], resistance_zone[1], current_price * 1.02)
+                tp = min(forecast['yhat_q25'], support_zone[0], current_price * 0.98)
+        
+        # Risk-reward ratio adjustment
+        risk = direction * (current_price - sl)
+        reward = direction * (tp - current_price)
         if risk > 0 and reward / risk < 1.5:
-            if signal_type == "BUY":
-                tp = current_price + risk * 1.5
-            else:
-                tp = current_price - risk * 1.5
+            tp = current_price + direction * risk * 1.5
+        
+        sl_str = format_price(sl, current_price)
+        tp_str = format_price(tp, current_price)
     
     # Format prices and generate analysis
     current_price_str = format_price(current_price, current_price)
-    sl_str = "N/A" if signal_type == "NO SIGNAL" else format_price(sl, current_price)
-    tp_str = "N/A" if signal_type == "NO SIGNAL" else format_price(tp, current_price)
     
     signal_status = "🟢 BUY" if signal_type == "BUY" else "🔴 SELL" if signal_type == "SELL" else "🟡 NO SIGNAL"
     
@@ -472,48 +578,57 @@ def run_strategy(df: pd.DataFrame) -> Tuple[Dict[str, Any], bool]:
     keltner_status = f"{'Above Upper' if current_price > upper_kc else 'Below Lower' if current_price < lower_kc else 'Within'} range: Upper {format_price(upper_kc, current_price)}, Lower {format_price(lower_kc, current_price)}"
     momentum_status = f"20-Period: {price_momentum:+.2f}% ({'Bullish' if bullish_momentum else 'Bearish' if bearish_momentum else 'Neutral'})"
     confidence_status = f"{confidence:.1f}% ({'High' if confidence >= 70 else 'Medium' if confidence >= 50 else 'Low'})"
-    support_zone_str = f"{format_price(support_zone[0], current_price)} → {format_price(support_zone[1], current_price)}"
-    resistance_zone_str = f"{format_price(resistance_zone[0], current_price)} → {format_price(resistance_zone[1], current_price)}"
-    
-    analysis_section = (
-        f"\n*📊 TRADING SIGNAL ANALYSIS*\n"
-        f"```\n"
-        f"{'Indicator':<20} {'Value':<60}\n"
-        f"{'🔹 RSI':<20} {format_strategy_number(rsi.iloc[-1]):<10} → {rsi_trend:<40}\n"
-        f"{'🔹 Stochastic':<20} %K {format_strategy_number(stoch_k.iloc[-1])}, %D {format_strategy_number(stoch_d.iloc[-1])} → {stoch_trend:<40}\n"
-        f"{'🔹 EMA Trend':<20} {ema_trend:<60}\n"
-        f"{'🔹 Keltner':<20} {keltner_status:<60}\n"
-        f"{'🔹 Momentum':<20} {momentum_status:<60}\n"
-        f"{'🔹 Confidence':<20} {confidence_status:<60}\n"
-        f"{'🔹 Support Zone':<20} {support_zone_str:<60}\n"
-        f"{'🔹 Resistance Zone':<20} {resistance_zone_str:<60}\n"
-        f"```\n"
-    )
+    support_low_str = format_price(support_zone[0], current_price)
+    resistance_high_str = format_price(resistance_zone[1], current_price)
+    support_zone_str = f"{support_low_str} → {format_price(support_zone[1], current_price)}"
+    resistance_zone_str = f"{format_price(resistance_zone[0], current_price)} → {resistance_high_str}"
+    
+    # Format indicator values once for both the analysis text and the snapshot
+    rsi_str = format_strategy_number(rsi_last)
+    stoch_k_str = format_strategy_number(stoch_k_last)
+    stoch_d_str = format_strategy_number(stoch_d_last)
+    
+    analysis_section = "".join([
+        "\n*📊 TRADING SIGNAL ANALYSIS*\n",
+        "```\n",
+        f"{'Indicator':<20} {'Value':<60}\n",
+        f"{'🔹 RSI':<20} {rsi_str:<10} → {rsi_trend:<40}\n",
+        f"{'🔹 Stochastic':<20} %K {stoch_k_str}, %D {stoch_d_str} → {stoch_trend:<40}\n",
+        f"{'🔹 EMA Trend':<20} {ema_trend:<60}\n",
+        f"{'🔹 Keltner':<20} {keltner_status:<60}\n",
+        f"{'🔹 Momentum':<20} {momentum_status:<60}\n",
+        f"{'🔹 Confidence':<20} {confidence_status:<60}\n",
+        f"{'🔹 Support Zone':<20} {support_zone_str:<60}\n",
+        f"{'🔹 Resistance Zone':<20} {resistance_zone_str:<60}\n",
+        "```\n",
+    ])
     
     # Breakout scenario simulation (when NO SIGNAL)
     breakout_summary = ""
+    bullish_signal = bearish_signal = None
+    rsi_bull_str = stoch_bull_str = bull_tp_str = bull_sl_str = None
+    rsi_bear_str = stoch_bear_str = bear_tp_str = bear_sl_str = None
     if signal_type == "NO SIGNAL":
         logger.info(f"Simulating breakout scenarios for {df.name}")
         
-        # Create copies for simulation
-        df_bullish = df.copy()
-        df_bearish = df.copy()
-        
+        # Only the last bar changes, so simulate on copies of the price arrays
         # Simulate bullish breakout
-        df_bullish.iloc[-1, df_bullish.columns.get_loc('Close')] = resistance_zone[1] * 1.01
-        df_bullish.iloc[-1, df_bullish.columns.get_loc('High')] = max(df_bullish.iloc[-1]['High'], resistance_zone[1] * 1.01)
-        df_bullish.iloc[-1, df_bullish.columns.get_loc('Low')] = min(df_bullish.iloc[-1]['Low'], resistance_zone[1] * 1.01)
+        bull_close, bull_high, bull_low = close.copy(), high.copy(), low.copy()
+        bull_close[-1] = resistance_zone[1] * 1.01
+        bull_high[-1] = max(high[-1], bull_close[-1])
+        bull_low[-1] = min(low[-1], bull_close[-1])
         
         # Simulate bearish breakdown
-        df_bearish.iloc[-1, df_bearish.columns.get_loc('Close')] = support_zone[0] * 0.99
-        df_bearish.iloc[-1, df_bearish.columns.get_loc('High')] = max(df_bearish.iloc[-1]['High'], support_zone[0] * 0.99)
-        df_bearish.iloc[-1, df_bearish.columns.get_loc('Low')] = min(df_bearish.iloc[-1]['Low'], support_zone[0] * 0.99)
+        bear_close, bear_high, bear_low = close.copy(), high.copy(), low.copy()
+        bear_close[-1] = support_zone[0] * 0.99
+        bear_high[-1] = max(high[-1], bear_close[-1])
+        bear_low[-1] = min(low[-1], bear_close[-1])
         
-        # Calculate indicators for simulations
-        rsi_bull = ta.momentum.RSIIndicator(df_bullish['Close']).rsi().iloc[-1]
-        stoch_bull = ta.momentum.StochasticOscillator(df_bullish['High'], df_bullish['Low'], df_bullish['Close']).stoch().iloc[-1]
-        rsi_bear = ta.momentum.RSIIndicator(df_bearish['Close']).rsi().iloc[-1]
-        stoch_bear = ta.momentum.StochasticOscillator(df_bearish['High'], df_bearish['Low'], df_bearish['Close']).stoch().iloc[-1]
+        # Calculate indicators for simulations (last values only)
+        rsi_bull = _rsi_last(bull_close, 14)
+        stoch_bull = _stoch_last(bull_high, bull_low, bull_close, 14)
+        rsi_bear = _rsi_last(bear_close, 14)
+        stoch_bear = _stoch_last(bear_high, bear_low, bear_close, 14)
         
         # Determine simulated signals (adjusted thresholds)
         bullish_signal = "BUY" if rsi_bull > 52 and stoch_bull > 45 else "NO SIGNAL"
@@ -527,40 +642,44 @@ def run_strategy(df: pd.DataFrame) -> Tuple[Dict[str, Any], bool]:
         
         # Enhance with forecast data
         if bullish_signal == "BUY" or bearish_signal == "SELL":
-            forecast = forecast_prices(df, periods=30)
+            forecast = forecast_bounds(close, periods=30)
             if forecast is not None:
                 if bullish_signal == "BUY":
-                    bull_tp = max(float(forecast['yhat'].quantile(0.75)), resistance_zone[1] * 1.03)
+                    bull_tp = max(forecast['yhat_q75'], resistance_zone[1] * 1.03)
                 if bearish_signal == "SELL":
-                    bear_tp = min(float(forecast['yhat'].quantile(0.25)), support_zone[0] * 0.97)
+                    bear_tp = min(forecast['yhat_q25'], support_zone[0] * 0.97)
         
         # Format breakout analysis
-        bull_tp_str = format_price(bull_tp, df['Close'].iloc[-1])
-        bull_sl_str = format_price(bull_sl, df['Close'].iloc[-1])
-        bear_tp_str = format_price(bear_tp, df['Close'].iloc[-1])
-        bear_sl_str = format_price(bear_sl, df['Close'].iloc[-1])
-        
-        breakout_summary = (
-            f"\n*🔮 HYPOTHETICAL BREAKOUT SCENARIOS $Dynamic Prediction$*\n"
-            f"*📈 Bullish Breakout → If price breaks above resistance {format_price(resistance_zone[1], df['Close'].iloc[-1])}*\n"
-            f"```\n"
-            f"{'Metric':<12} {'Value':<15}\n"
-            f"{'RSI':<12} {format_strategy_number(rsi_bull):<15}\n"
-            f"{'Stochastic':<12} {format_strategy_number(stoch_bull):<15}\n"
-            f"{'Signal':<12} {bullish_signal:<15}\n"
-            f"{'TP Target':<12} {bull_tp_str:<15}\n"
-            f"{'SL Level':<12} {bull_sl_str:<15}\n"
-            f"```\n"
-            f"*📉 Bearish Breakdown → If price breaks below support {format_price(support_zone[0], df['Close'].iloc[-1])}*\n"
-            f"```\n"
-            f"{'Metric':<12} {'Value':<15}\n"
-            f"{'RSI':<12} {format_strategy_number(rsi_bear):<15}\n"
-            f"{'Stochastic':<12} {format_strategy_number(stoch_bear):<15}\n"
-            f"{'Signal':<12} {bearish_signal:<15}\n"
-            f"{'TP Target':<12} {bear_tp_str:<15}\n"
-            f"{'SL Level':<12} {bear_sl_str:<15}\n"
-            f"```\n"
-        )
+        rsi_bull_str = format_strategy_number(rsi_bull)
+        stoch_bull_str = format_strategy_number(stoch_bull)
+        rsi_bear_str = format_strategy_number(rsi_bear)
+        stoch_bear_str = format_strategy_number(stoch_bear)
+        bull_tp_str = format_price(bull_tp, current_price)
+        bull_sl_str = format_price(bull_sl, current_price)
+        bear_tp_str = format_price(bear_tp, current_price)
+        bear_sl_str = format_price(bear_sl, current_price)
+        
+        breakout_summary = "".join([
+            "\n*🔮 HYPOTHETICAL BREAKOUT SCENARIOS $Dynamic Prediction$*\n",
+            f"*📈 Bullish Breakout → If price breaks above resistance {resistance_high_str}*\n",
+            "```\n",
+            f"{'Metric':<12} {'Value':<15}\n",
+            f"{'RSI':<12} {rsi_bull_str:<15}\n",
+            f"{'Stochastic':<12} {stoch_bull_str:<15}\n",
+            f"{'Signal':<12} {bullish_signal:<15}\n",
+            f"{'TP Target':<12} {bull_tp_str:<15}\n",
+            f"{'SL Level':<12} {bull_sl_str:<15}\n",
+            "```\n",
+            f"*📉 Bearish Breakdown → If price breaks below support {support_low_str}*\n",
+            "```\n",
+            f"{'Metric':<12} {'Value':<15}\n",
+            f"{'RSI':<12} {rsi_bear_str:<15}\n",
+            f"{'Stochastic':<12} {stoch_bear_str:<15}\n",
+            f"{'Signal':<12} {bearish_signal:<15}\n",
+            f"{'TP Target':<12} {bear_tp_str:<15}\n",
+            f"{'SL Level':<12} {bear_sl_str:<15}\n",
+            "```\n",
+        ])
     
     # Generate final message
     final_message = (
@@ -576,11 +695,8 @@ def run_strategy(df: pd.DataFrame) -> Tuple[Dict[str, Any], bool]:
     final_message = escape_markdown(final_message)
     
     # Generate chart
-    save_path = f"{CHARTS_DIR}/{df.name.lower()}_chart.jpg"
-    chart_base64 = ""
-    if generate_chart_snapshot(df, df.name, save_path):
-        with open(save_path, "rb") as image_file:
-            chart_base64 = f"data:image/png;base64,{base64.b64encode(image_file.read()).decode('utf-8')}"
+    chart_bytes = generate_chart_snapshot(df, df.name)
+    chart_base64 = f"data:image/png;base64,{base64.b64encode(chart_bytes).decode('ascii')}" if chart_bytes else ""
     
     # Create snapshot object
     snapshot_object = {
@@ -589,8 +705,8 @@ def run_strategy(df: pd.DataFrame) -> Tuple[Dict[str, Any], bool]:
         "tp": float(tp) if tp is not None else 0,
         "sl": float(sl) if sl is not None else 0,
         "indicators": {
-            "rsi": f"{format_strategy_number(rsi.iloc[-1])} → {rsi_trend}",
-            "stochastic": f"%K {format_strategy_number(stoch_k.iloc[-1])}, %D {format_strategy_number(stoch_d.iloc[-1])} → {stoch_trend}",
+            "rsi": f"{rsi_str} → {rsi_trend}",
+            "stochastic": f"%K {stoch_k_str}, %D {stoch_d_str} → {stoch_trend}",
             "ema": ema_trend,
             "keltner": keltner_status,
             "momentum": momentum_status,
@@ -598,20 +714,21 @@ def run_strategy(df: pd.DataFrame) -> Tuple[Dict[str, Any], bool]:
         },
         "support_zone": support_zone_str,
         "resistance_zone": resistance_zone_str,
+        # Breakout values are only set for NO SIGNAL and stay None otherwise
         "breakout": {
             "bullish": {
-                "rsi": f"{format_strategy_number(rsi_bull)}" if signal_type == "NO SIGNAL" else None,
-                "stochastic": f"{format_strategy_number(stoch_bull)}" if signal_type == "NO SIGNAL" else None,
-                "signal": bullish_signal if signal_type == "NO SIGNAL" else None,
-                "tp": bull_tp_str if signal_type == "NO SIGNAL" else None,
-                "sl": bull_sl_str if signal_type == "NO SIGNAL" else None,
+                "rsi": rsi_bull_str,
+                "stochastic": stoch_bull_str,
+                "signal": bullish_signal,
+                "tp": bull_tp_str,
+                "sl": bull_sl_str,
             },
             "bearish": {
-                "rsi": f"{format_strategy_number(rsi_bear)}" if signal_type == "NO SIGNAL" else None,
-                "stochastic": f"{format_strategy_number(stoch_bear)}" if signal_type == "NO SIGNAL" else None,
-                "signal": bearish_signal if signal_type == "NO SIGNAL" else None,
-                "tp": bear_tp_str if signal_type == "NO SIGNAL" else None,
-                "sl": bear_sl_str if signal_type == "NO SIGNAL" else None,
+                "rsi": rsi_bear_str,
+                "stochastic": stoch_bear_str,
+                "signal": bearish_signal,
+                "tp": bear_tp_str,
+                "sl": bear_sl_str,
             }
         }
     }
@@ -624,109 +741,112 @@ def run_strategy(df: pd.DataFrame) -> Tuple[Dict[str, Any], bool]:
         "snapshot": snapshot_object,
     }, True
 
+def handle(pair: str, timeframe: str = '15m') -> Dict[str, Any]:
+    """Analyze one trading pair and return the response payload (with an 'error' key on failure)"""
+    # Get CoinGecko coin ID
+    coin_id = get_coingecko_id(pair)
+    
+    # Fetch market data and current price data from CoinGecko concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        market_future = executor.submit(get_coingecko_market_data, coin_id, 7)
+        price_future = executor.submit(get_current_price_data, coin_id)
+        crypto_data = market_future.result()
+        price_data = price_future.result()
+    
+    if crypto_data is None or crypto_data.empty:
+        return {
+            'error': f'Unable to fetch data for {pair}',
+            'pair': pair,
+            'timeframe': timeframe,
+            'message': f'Cryptocurrency not found. Tried ID: {coin_id}. Please check the symbol (e.g., PEPEUSDT, BTCUSDT, SHIBUSDT)'
+        }
+    
+    # Set the dataframe name for use in strategy
+    crypto_data.name = pair
+    
+    # Run the new comprehensive strategy
+    strategy_result, success = run_strategy(crypto_data)
+    
+    if not success:
+        return {
+            'error': 'Strategy analysis failed',
+            'pair': pair,
+            'timeframe': timeframe,
+            'message': strategy_result.get('snapshot', 'Unknown error')
+        }
+    
+    # Use current price data for additional info
+    current_price = price_data['current_price'] if price_data else float(crypto_data['Close'].iloc[-1])
+    price_change_24h = price_data['price_change_24h'] if price_data else None
+    
+    # Extract indicator values more safely
+    def safe_extract_rsi(rsi_str):
+        # Format: "12.34 → Trend"
+        try:
+            return float(rsi_str.partition(' ')[0])
+        except ValueError:
+            return None
+            
+    def safe_extract_stoch(stoch_str):
+        # Format: "%K 12.34, %D 45.67 → Trend" - only the first four fields are needed
+        try:
+            parts = stoch_str.split(' ', 4)
+            k_val = float(parts[1].rstrip(','))
+            d_val = float(parts[3])
+            return k_val, d_val
+        except (ValueError, IndexError):
+            return None, None
+    
+    rsi_val = safe_extract_rsi(strategy_result['snapshot']['indicators'].get('rsi', ''))
+    stoch_k_val, stoch_d_val = safe_extract_stoch(strategy_result['snapshot']['indicators'].get('stochastic', ''))
+    
+    # Prepare response in the expected format
+    return {
+        'pair': pair,
+        'timeframe': timeframe,
+        'timestamp': datetime.now().isoformat(),
+        'signal': strategy_result['signal'],
+        'confidence': int(strategy_result.get('confidence', 50)),
+        'reason': f"Advanced strategy analysis with {len(crypto_data)} data points",
+        'indicators': {
+            'rsi': rsi_val,
+            'ema_short': None,  # Not used in new strategy
+            'ema_long': None,   # Not used in new strategy
+            'stoch_k': stoch_k_val,
+            'stoch_d': stoch_d_val,
+            'macd': None,       # Available but not exposed in simple format
+            'macd_signal': None,  # Available but not exposed in simple format
+            'current_price': float(strategy_result['snapshot']['current_price'])
+        },
+        'last_price': round(float(current_price), 10),
+        'volume': int(crypto_data['Volume'].iloc[-1]) if 'Volume' in crypto_data.columns else None,
+        'price_change_24h': round(float(price_change_24h), 2) if price_change_24h else None,
+        'data_source': 'CoinGecko API + Advanced Strategy',
+        'coin_id': coin_id,
+        'strategy_details': {
+            'tp': strategy_result['tp'],
+            'sl': strategy_result['sl'],
+            'support_zone': strategy_result['snapshot']['support_zone'],
+            'resistance_zone': strategy_result['snapshot']['resistance_zone'],
+            'ema_trend': strategy_result['snapshot']['indicators']['ema'],
+            'keltner_status': strategy_result['snapshot']['indicators']['keltner'],
+            'momentum': strategy_result['snapshot']['indicators']['momentum'],
+            'confidence_level': strategy_result['snapshot']['indicators']['confidence']
+        }
+    }
+
 def main():
     if len(sys.argv) < 2:
-        print(json.dumps({'error': 'Trading pair is required'}))
+        print(to_json({'error': 'Trading pair is required'}))
         sys.exit(1)
     
     pair = sys.argv[1].upper()
     timeframe = sys.argv[2] if len(sys.argv) > 2 else '15m'
     
-    try:
-        # Get CoinGecko coin ID
-        coin_id = get_coingecko_id(pair)
-        
-        # Fetch market data from CoinGecko
-        crypto_data = get_coingecko_market_data(coin_id, days=7)
-        
-        if crypto_data is None or crypto_data.empty:
-            print(json.dumps({
-                'error': f'Unable to fetch data for {pair}',
-                'pair': pair,
-                'timeframe': timeframe,
-                'message': f'Cryptocurrency not found. Tried ID: {coin_id}. Please check the symbol (e.g., PEPEUSDT, BTCUSDT, SHIBUSDT)'
-            }))
-            sys.exit(1)
-        
-        # Set the dataframe name for use in strategy
-        crypto_data.name = pair
-        
-        # Run the new comprehensive strategy
-        strategy_result, success = run_strategy(crypto_data)
-        
-        if not success:
-            print(json.dumps({
-                'error': 'Strategy analysis failed',
-                'pair': pair,
-                'timeframe': timeframe,
-                'message': strategy_result.get('snapshot', 'Unknown error')
-            }))
-            sys.exit(1)
-        
-        # Get current price data for additional info
-        price_data = get_current_price_data(coin_id)
-        current_price = price_data['current_price'] if price_data else float(crypto_data['Close'].iloc[-1])
-        price_change_24h = price_data['price_change_24h'] if price_data else None
-        
-        # Extract indicator values more safely
-        def safe_extract_rsi(rsi_str):
-            try:
-                return float(rsi_str.split(' ')[0])
-            except:
-                return None
-                
-        def safe_extract_stoch(stoch_str):
-            try:
-                parts = stoch_str.split(' ')
-                k_val = float(parts[1].replace(',', ''))
-                d_val = float(parts[3].replace(',', ''))
-                return k_val, d_val
-            except:
-                return None, None
-        
-        rsi_val = safe_extract_rsi(strategy_result['snapshot']['indicators'].get('rsi', ''))
-        stoch_k_val, stoch_d_val = safe_extract_stoch(strategy_result['snapshot']['indicators'].get('stochastic', ''))
-        
-        # Prepare response in the expected format
-        response = {
-            'pair': pair,
-            'timeframe': timeframe,
-            'timestamp': datetime.now().isoformat(),
-            'signal': strategy_result['signal'],
-            'confidence': int(strategy_result.get('confidence', 50)),
-            'reason': f"Advanced strategy analysis with {len(crypto_data)} data points",
-            'indicators': {
-                'rsi': rsi_val,
-                'ema_short': None,  # Not used in new strategy
-                'ema_long': None,   # Not used in new strategy
-                'stoch_k': stoch_k_val,
-                'stoch_d': stoch_d_val,
-                'macd': None,       # Available but not exposed in simple format
-                'macd_signal': None,  # Available but not exposed in simple format
-                'current_price': float(strategy_result['snapshot']['current_price'])
-            },
-            'last_price': round(float(current_price), 10),
-            'volume': int(crypto_data['Volume'].iloc[-1]) if 'Volume' in crypto_data.columns else None,
-            'price_change_24h': round(float(price_change_24h), 2) if price_change_24h else None,
-            'data_source': 'CoinGecko API + Advanced Strategy',
-            'coin_id': coin_id,
-            'strategy_details': {
-                'tp': strategy_result['tp'],
-                'sl': strategy_result['sl'],
-                'support_zone': strategy_result['snapshot']['support_zone'],
-                'resistance_zone': strategy_result['snapshot']['resistance_zone'],
-                'ema_trend': strategy_result['snapshot']['indicators']['ema'],
-                'keltner_status': strategy_result['snapshot']['indicators']['keltner'],
-                'momentum': strategy_result['snapshot']['indicators']['momentum'],
-                'confidence_level': strategy_result['snapshot']['indicators']['confidence']
-            }
-        }
-        
-        print(json.dumps(response))
-        
-    except Exception as e:
-        print(json.dumps({'error': f'Analysis failed: {str(e)}'}), file=sys.stderr)
-        sys.exit(1)
+    exit_code, stream, output = cli_response(handle, pair, timeframe)
+    print(output, file=sys.stderr if stream == 'stderr' else sys.stdout)
+    if exit_code:
+        sys.exit(exit_code)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -4,109 +4,185 @@ Development/mock version of analyze_pair.py that doesn't require internet access
 This generates realistic technical analysis data for testing purposes.
 """
 import sys
-import json
+
+if __name__ == '__main__':
+    # Hand the request to a running serve.py worker when there is one; it has
+    # everything below imported already, so this process can skip the imports
+    import serve
+    serve.run_cli('analyze_pair_dev')
+
+import os
+import stat
+import zlib
+import hashlib
+import tempfile
+import functools
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime, timedelta
-import warnings
-warnings.filterwarnings('ignore')
 
-def generate_mock_ohlc_data(days=7):
-    """Generate realistic OHLC data for testing"""
-    # Start with a base price around Bitcoin's typical range
-    base_price = 45000.0
+# Skip pandas' SettingWithCopy checks instead of silencing every warning globally
+pd.options.mode.chained_assignment = None
+
+import _kernels
+from _serialize import to_json, cli_response
+
+# One generator for the whole process instead of re-seeding per call
+_RNG = np.random.default_rng()
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+MOCK_CACHE_DIR = '/tmp'
+
+# Mock market parameters
+MOCK_BASE_PRICE = 45000.0  # Around Bitcoin's typical range
+MOCK_HOURLY_VOLATILITY = 0.02  # 2% std of hourly price changes
+MOCK_WICK_SCALE = 0.5  # Wicks extend up to half the bar's move beyond the body
+MOCK_VOLUME_RANGE = (100000, 1000000)
+
+# Bump when _mock_ohlcv changes so existing cache files are no longer used
+MOCK_DATA_VERSION = 1
+
+def _pair_seed(pair):
+    """Stable per-pair seed so repeated runs for a pair reuse the cached mock data"""
+    return zlib.crc32(pair.encode())
+
+def _mock_ohlcv(hours, rng):
+    """Simulate hourly OHLCV rows as a (5, hours) array"""
+    base_price = MOCK_BASE_PRICE
     
-    # Generate timestamps
-    end_time = datetime.now()
-    start_time = end_time - timedelta(days=days)
+    # Draw all randomness in bulk instead of per bar
+    price_change_pct = rng.normal(0, MOCK_HOURLY_VOLATILITY, size=hours)
+    high_offsets = rng.uniform(0, 1, size=hours)
+    low_offsets = rng.uniform(0, 1, size=hours)
+    volume = rng.uniform(*MOCK_VOLUME_RANGE, size=hours)
     
-    # Generate hourly data points
-    hours = days * 24
-    timestamps = [start_time + timedelta(hours=i) for i in range(hours)]
+    # Simulate price movements by compounding the hourly changes
+    close_price = base_price * np.cumprod(1 + price_change_pct)
+    open_price = np.empty_like(close_price)
+    open_price[0] = base_price
+    open_price[1:] = close_price[:-1]
     
-    data = []
-    current_price = base_price
+    # Generate OHLC
+    volatility = np.abs(price_change_pct) * open_price * MOCK_WICK_SCALE
+    high_price = np.maximum(open_price, close_price) + high_offsets * volatility
+    low_price = np.minimum(open_price, close_price) - low_offsets * volatility
     
-    for ts in timestamps:
-        # Simulate price movements with some volatility
-        price_change_pct = np.random.normal(0, 0.02)  # 2% std volatility
-        new_price = current_price * (1 + price_change_pct)
-        
-        # Generate OHLC
-        volatility = abs(price_change_pct) * current_price * 0.5
-        
-        open_price = current_price
-        close_price = new_price
-        high_price = max(open_price, close_price) + np.random.uniform(0, volatility)
-        low_price = min(open_price, close_price) - np.random.uniform(0, volatility)
-        
-        volume = np.random.uniform(100000, 1000000)
-        
-        data.append({
-            'timestamp': ts,
-            'Open': open_price,
-            'High': high_price,
-            'Low': low_price,
-            'Close': close_price,
-            'Volume': volume
-        })
-        
-        current_price = new_price
+    return np.stack([open_price, high_price, low_price, close_price, volume])
+
+def _mock_cache_tag():
+    """Short hash of the generator version and parameters, part of the cache file name"""
+    params = (MOCK_DATA_VERSION, MOCK_BASE_PRICE, MOCK_HOURLY_VOLATILITY,
+              MOCK_WICK_SCALE, MOCK_VOLUME_RANGE)
+    return hashlib.sha256(repr(params).encode()).hexdigest()[:12]
+
+def _is_own_file(path):
+    """Check that path is a regular file owned by this user (not planted in the shared dir)"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISREG(st.st_mode) and st.st_uid == os.getuid()
+
+@functools.lru_cache(maxsize=8)
+def _cached_mock_ohlcv(days, seed):
+    """Seeded mock rows, memoized in-process and as a .npy file under /tmp"""
+    path = os.path.join(MOCK_CACHE_DIR, f"mock_{days}_{seed}_{_mock_cache_tag()}.npy")
+    if _is_own_file(path):
+        try:
+            return np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            pass  # Unreadable - regenerate it
+    
+    ohlcv = _mock_ohlcv(days * 24, np.random.default_rng(seed))
+    tmp_path = None
+    try:
+        # Write to a private, uniquely named file first so concurrent runs
+        # (processes or worker threads) never read or clobber a partial cache
+        fd, tmp_path = tempfile.mkstemp(prefix='mock_', suffix='.tmp', dir=MOCK_CACHE_DIR)
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, ohlcv)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Caching is best-effort
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+    return ohlcv
+
+def generate_mock_ohlc_data(days=7, seed=None):
+    """Generate realistic OHLC data for testing (reproducible and cached when seeded)"""
+    # Generate hourly timestamps ending now
+    end_time = datetime.now()
+    start_time = end_time - timedelta(days=days)
+    hours = days * 24
+    timestamps = pd.date_range(start=start_time, periods=hours, freq='h', name='timestamp')
     
-    df = pd.DataFrame(data)
-    df.set_index('timestamp', inplace=True)
+    if seed is None:
+        ohlcv = _mock_ohlcv(hours, _RNG)
+    else:
+        ohlcv = _cached_mock_ohlcv(days, seed)
     
-    return df[['Open', 'High', 'Low', 'Close', 'Volume']]
+    # ohlcv.T is column-major, so pandas can wrap it as a single block without
+    # copying; cached rows are shared (or read-only mmaps) and get their own copy
+    return pd.DataFrame(ohlcv.T, columns=OHLCV_COLUMNS, index=timestamps, copy=seed is not None)
+
+def _tail_mean(values, window):
+    """Mean of the last window values, NaN if there are not enough of them"""
+    return values[-window:].mean() if values.size >= window else np.nan
 
-def calculate_indicators(data):
-    """Calculate technical indicators using mock data"""
+def _last_indicators(close, high, low):
+    """Calculate only the latest indicator values (what generate_signal reads)"""
     try:
-        # Simple moving averages for EMA simulation
-        ema_short = data['Close'].rolling(window=12).mean()
-        ema_long = data['Close'].rolling(window=26).mean()
-        
-        # Simple RSI calculation
-        delta = data['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        
-        # Simple Stochastic
-        low_14 = data['Low'].rolling(window=14).min()
-        high_14 = data['High'].rolling(window=14).max()
-        stoch_k = 100 * ((data['Close'] - low_14) / (high_14 - low_14))
-        stoch_d = stoch_k.rolling(window=3).mean()
-        
-        # Simple MACD
+        # The EMAs are recursive, so they still need the whole series
+        ema_short = _kernels.ema(close, 12)
+        ema_long = _kernels.ema(close, 26)
         macd_line = ema_short - ema_long
-        macd_signal = macd_line.rolling(window=9).mean()
         
-        # Simple Bollinger Bands
-        bb_middle = data['Close'].rolling(window=20).mean()
-        bb_std = data['Close'].rolling(window=20).std()
-        bb_upper = bb_middle + (bb_std * 2)
-        bb_lower = bb_middle - (bb_std * 2)
+        # RSI over the last 14 price changes
+        rsi = np.nan
+        if close.size >= 15:
+            delta = np.diff(close[-15:])
+            avg_gain = np.where(delta > 0, delta, 0.0).mean()
+            avg_loss = np.where(delta < 0, -delta, 0.0).mean()
+            rs = avg_gain / avg_loss if avg_loss != 0 else np.inf
+            rsi = 100 - (100 / (1 + rs))
+        
+        # Stochastic %K for the last 3 bars (needed for %D)
+        stoch_k = stoch_d = np.nan
+        if close.size >= 16:
+            low_14 = sliding_window_view(low[-16:], 14).min(axis=-1)
+            high_14 = sliding_window_view(high[-16:], 14).max(axis=-1)
+            with np.errstate(divide='ignore', invalid='ignore'):  # flat windows give NaN
+                k = 100 * ((close[-3:] - low_14) / (high_14 - low_14))
+            stoch_k = k[-1]
+            stoch_d = k.mean()
+        
+        # Bollinger Bands over the last 20 closes
+        bb_middle = _tail_mean(close, 20)
+        bb_std = close[-20:].std(ddof=1) if close.size >= 20 else np.nan
         
         return {
             'rsi': rsi,
-            'ema_short': ema_short,
-            'ema_long': ema_long,
+            'ema_short': ema_short[-1],
+            'ema_long': ema_long[-1],
             'stoch_k': stoch_k,
             'stoch_d': stoch_d,
-            'macd': macd_line,
-            'macd_signal': macd_signal,
-            'bb_upper': bb_upper,
+            'macd': macd_line[-1],
+            'macd_signal': _tail_mean(macd_line, 9),
+            'bb_upper': bb_middle + (bb_std * 2),
             'bb_middle': bb_middle,
-            'bb_lower': bb_lower
+            'bb_lower': bb_middle - (bb_std * 2)
         }
     except Exception as e:
         print(f"Error calculating indicators: {e}", file=sys.stderr)
         return None
 
-def generate_signal(data, indicators):
-    """Generate trading signal based on technical indicators"""
-    if len(data) < 50:
+def generate_signal(close, indicators):
+    """Generate trading signal based on technical indicators (close is the close-price array)"""
+    if len(close) < 50:
         return {
             'signal': 'HOLD',
             'confidence': 50,
@@ -119,74 +195,62 @@ def generate_signal(data, indicators):
                 'stoch_d': None,
                 'macd': None,
                 'macd_signal': None,
-                'current_price': float(data['Close'].iloc[-1])
+                'current_price': float(close[-1])
             }
         }
     
     try:
         # Get latest values with safe fallbacks
-        latest_rsi = indicators['rsi'].iloc[-1] if not indicators['rsi'].empty and pd.notna(indicators['rsi'].iloc[-1]) else 50
-        
-        ema_short_val = indicators['ema_short'].iloc[-1] if not indicators['ema_short'].empty and pd.notna(indicators['ema_short'].iloc[-1]) else 0
-        ema_long_val = indicators['ema_long'].iloc[-1] if not indicators['ema_long'].empty and pd.notna(indicators['ema_long'].iloc[-1]) else 0
-        latest_ema_diff = ema_short_val - ema_long_val
-        
-        latest_stoch_k = indicators['stoch_k'].iloc[-1] if not indicators['stoch_k'].empty and pd.notna(indicators['stoch_k'].iloc[-1]) else 50
-        latest_stoch_d = indicators['stoch_d'].iloc[-1] if not indicators['stoch_d'].empty and pd.notna(indicators['stoch_d'].iloc[-1]) else 50
-        latest_macd = indicators['macd'].iloc[-1] if not indicators['macd'].empty and pd.notna(indicators['macd'].iloc[-1]) else 0
-        latest_macd_signal = indicators['macd_signal'].iloc[-1] if not indicators['macd_signal'].empty and pd.notna(indicators['macd_signal'].iloc[-1]) else 0
-        
-        current_price = float(data['Close'].iloc[-1])
-        latest_bb_upper = indicators['bb_upper'].iloc[-1] if not indicators['bb_upper'].empty and pd.notna(indicators['bb_upper'].iloc[-1]) else current_price * 1.02
-        latest_bb_lower = indicators['bb_lower'].iloc[-1] if not indicators['bb_lower'].empty and pd.notna(indicators['bb_lower'].iloc[-1]) else current_price * 0.98
+        snap = {name: float(value) for name, value in indicators.items()}
         
-        # Signal scoring system
-        buy_signals = 0
-        sell_signals = 0
-        total_signals = 0
+        def _last(name, default):
+            value = snap[name]
+            return default if np.isnan(value) else value
         
-        # RSI Analysis (30% weight)
-        if latest_rsi < 30:  # Oversold
-            buy_signals += 3
-        elif latest_rsi > 70:  # Overbought
-            sell_signals += 3
-        elif latest_rsi < 50:
-            buy_signals += 1
-        elif latest_rsi > 50:
-            sell_signals += 1
-        total_signals += 3
+        latest_rsi = _last('rsi', 50)
         
-        # EMA Crossover (25% weight)
-        if latest_ema_diff > 0:  # Short EMA above Long EMA
-            buy_signals += 2.5
-        else:
-            sell_signals += 2.5
-        total_signals += 2.5
-        
-        # Stochastic (20% weight)
-        if latest_stoch_k < 20 and latest_stoch_d < 20:  # Oversold
-            buy_signals += 2
-        elif latest_stoch_k > 80 and latest_stoch_d > 80:  # Overbought
-            sell_signals += 2
-        elif latest_stoch_k > latest_stoch_d:  # K above D
-            buy_signals += 1
-        else:
-            sell_signals += 1
-        total_signals += 2
-        
-        # MACD (15% weight)
-        if latest_macd > latest_macd_signal:  # MACD above signal
-            buy_signals += 1.5
-        else:
-            sell_signals += 1.5
-        total_signals += 1.5
+        ema_short_val = _last('ema_short', 0)
+        ema_long_val = _last('ema_long', 0)
+        latest_ema_diff = ema_short_val - ema_long_val
         
-        # Bollinger Bands (10% weight)
-        if current_price < latest_bb_lower:  # Below lower band
-            buy_signals += 1
-        elif current_price > latest_bb_upper:  # Above upper band
-            sell_signals += 1
-        total_signals += 1
+        latest_stoch_k = _last('stoch_k', 50)
+        latest_stoch_d = _last('stoch_d', 50)
+        latest_macd = _last('macd', 0)
+        latest_macd_signal = _last('macd_signal', 0)
+        
+        current_price = float(close[-1])
+        latest_bb_upper = _last('bb_upper', current_price * 1.02)
+        latest_bb_lower = _last('bb_lower', current_price * 0.98)
+        
+        # Signal scoring system: each rule adds weight * condition, so the
+        # score is straight-line arithmetic with no data-dependent branches
+        rsi_oversold = latest_rsi < 30
+        rsi_overbought = latest_rsi > 70
+        rsi_mid = not (rsi_oversold or rsi_overbought)
+        ema_bullish = latest_ema_diff > 0
+        stoch_oversold = latest_stoch_k < 20 and latest_stoch_d < 20
+        stoch_overbought = latest_stoch_k > 80 and latest_stoch_d > 80
+        stoch_mid = not (stoch_oversold or stoch_overbought)
+        stoch_k_above_d = latest_stoch_k > latest_stoch_d
+        macd_bullish = latest_macd > latest_macd_signal
+        below_bb = current_price < latest_bb_lower
+        above_bb = current_price > latest_bb_upper
+        
+        buy_signals = (
+            3 * rsi_oversold + 1 * (rsi_mid and latest_rsi < 50)     # RSI (30% weight)
+            + 2.5 * ema_bullish                                       # EMA crossover (25% weight)
+            + 2 * stoch_oversold + 1 * (stoch_mid and stoch_k_above_d)  # Stochastic (20% weight)
+            + 1.5 * macd_bullish                                      # MACD (15% weight)
+            + 1 * below_bb                                            # Bollinger Bands (10% weight)
+        )
+        sell_signals = (
+            3 * rsi_overbought + 1 * (rsi_mid and latest_rsi > 50)
+            + 2.5 * (not ema_bullish)
+            + 2 * stoch_overbought + 1 * (stoch_mid and not stoch_k_above_d)
+            + 1.5 * (not macd_bullish)
+            + 1 * (not below_bb and above_bb)
+        )
+        total_signals = 3 + 2.5 + 2 + 1.5 + 1
         
         # Calculate confidence and determine signal
         buy_confidence = (buy_signals / total_signals) * 100
@@ -210,13 +274,13 @@ def generate_signal(data, indicators):
             'confidence': confidence,
             'reason': reason,
             'indicators': {
-                'rsi': round(float(latest_rsi), 2) if pd.notna(latest_rsi) else None,
-                'ema_short': round(float(ema_short_val), 6) if pd.notna(ema_short_val) and ema_short_val != 0 else None,
-                'ema_long': round(float(ema_long_val), 6) if pd.notna(ema_long_val) and ema_long_val != 0 else None,
-                'stoch_k': round(float(latest_stoch_k), 2) if pd.notna(latest_stoch_k) else None,
-                'stoch_d': round(float(latest_stoch_d), 2) if pd.notna(latest_stoch_d) else None,
-                'macd': round(float(latest_macd), 6) if pd.notna(latest_macd) else None,
-                'macd_signal': round(float(latest_macd_signal), 6) if pd.notna(latest_macd_signal) else None,
+                'rsi': round(float(latest_rsi), 2),
+                'ema_short': round(float(ema_short_val), 6) if ema_short_val != 0 else None,
+                'ema_long': round(float(ema_long_val), 6) if ema_long_val != 0 else None,
+                'stoch_k': round(float(latest_stoch_k), 2),
+                'stoch_d': round(float(latest_stoch_d), 2),
+                'macd': round(float(latest_macd), 6),
+                'macd_signal': round(float(latest_macd_signal), 6),
                 'current_price': round(float(current_price), 2)
             }
         }
@@ -235,72 +299,75 @@ def generate_signal(data, indicators):
                 'stoch_d': None,
                 'macd': None,
                 'macd_signal': None,
-                'current_price': float(data['Close'].iloc[-1])
+                'current_price': float(close[-1])
             }
         }
 
+def handle(pair, timeframe='15m'):
+    """Analyze one trading pair on mock data and return the response payload (with an 'error' key on failure)"""
+    # Generate mock market data
+    crypto_data = generate_mock_ohlc_data(days=7, seed=_pair_seed(pair))
+    
+    if crypto_data is None or crypto_data.empty:
+        return {
+            'error': f'Unable to generate mock data for {pair}',
+            'pair': pair,
+            'timeframe': timeframe
+        }
+    
+    # Convert the columns once; everything below works on these arrays
+    close_arr = crypto_data['Close'].to_numpy(dtype=np.float64, copy=False)
+    high_arr = crypto_data['High'].to_numpy(dtype=np.float64, copy=False)
+    low_arr = crypto_data['Low'].to_numpy(dtype=np.float64, copy=False)
+    
+    # Calculate the latest indicator values (only the last bar is used)
+    indicators = _last_indicators(close_arr, high_arr, low_arr)
+    
+    if indicators is None:
+        return {
+            'error': 'Failed to calculate technical indicators',
+            'pair': pair,
+            'message': 'Insufficient data for technical analysis'
+        }
+    
+    # Generate signal
+    signal_data = generate_signal(close_arr, indicators)
+    
+    # Get current price (last price from mock data)
+    current_price = float(close_arr[-1])
+    
+    # Simulate 24h price change
+    price_24h_ago = float(close_arr[-24]) if close_arr.size >= 24 else current_price
+    price_change_24h = ((current_price - price_24h_ago) / price_24h_ago) * 100
+    
+    # Prepare response
+    return {
+        'pair': pair,
+        'timeframe': timeframe,
+        'timestamp': datetime.now().isoformat(),
+        'signal': signal_data['signal'],
+        'confidence': signal_data['confidence'],
+        'reason': signal_data['reason'],
+        'indicators': signal_data['indicators'],
+        'last_price': round(float(current_price), 2),
+        'volume': int(crypto_data['Volume'].iloc[-1]) if 'Volume' in crypto_data.columns else None,
+        'price_change_24h': round(float(price_change_24h), 2),
+        'data_source': 'Mock Data (Development Mode)',
+        'note': 'This is simulated data for testing purposes'
+    }
+
 def main():
     if len(sys.argv) < 2:
-        print(json.dumps({'error': 'Trading pair is required'}))
+        print(to_json({'error': 'Trading pair is required'}))
         sys.exit(1)
     
     pair = sys.argv[1].upper()
     timeframe = sys.argv[2] if len(sys.argv) > 2 else '15m'
     
-    try:
-        # Generate mock market data
-        crypto_data = generate_mock_ohlc_data(days=7)
-        
-        if crypto_data is None or crypto_data.empty:
-            print(json.dumps({
-                'error': f'Unable to generate mock data for {pair}',
-                'pair': pair,
-                'timeframe': timeframe
-            }))
-            sys.exit(1)
-        
-        # Calculate indicators
-        indicators = calculate_indicators(crypto_data)
-        
-        if indicators is None:
-            print(json.dumps({
-                'error': 'Failed to calculate technical indicators',
-                'pair': pair,
-                'message': 'Insufficient data for technical analysis'
-            }))
-            sys.exit(1)
-        
-        # Generate signal
-        signal_data = generate_signal(crypto_data, indicators)
-        
-        # Get current price (last price from mock data)
-        current_price = float(crypto_data['Close'].iloc[-1])
-        
-        # Simulate 24h price change
-        price_24h_ago = float(crypto_data['Close'].iloc[-24]) if len(crypto_data) >= 24 else current_price
-        price_change_24h = ((current_price - price_24h_ago) / price_24h_ago) * 100
-        
-        # Prepare response
-        response = {
-            'pair': pair,
-            'timeframe': timeframe,
-            'timestamp': datetime.now().isoformat(),
-            'signal': signal_data['signal'],
-            'confidence': signal_data['confidence'],
-            'reason': signal_data['reason'],
-            'indicators': signal_data['indicators'],
-            'last_price': round(float(current_price), 2),
-            'volume': int(crypto_data['Volume'].iloc[-1]) if 'Volume' in crypto_data.columns else None,
-            'price_change_24h': round(float(price_change_24h), 2),
-            'data_source': 'Mock Data (Development Mode)',
-            'note': 'This is simulated data for testing purposes'
-        }
-        
-        print(json.dumps(response))
-        
-    except Exception as e:
-        print(json.dumps({'error': f'Analysis failed: {str(e)}'}), file=sys.stderr)
-        sys.exit(1)
+    exit_code, stream, output = cli_response(handle, pair, timeframe)
+    print(output, file=sys.stderr if stream == 'stderr' else sys.stdout)
+    if exit_code:
+        sys.exit(exit_code)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Ahead-of-time compile the numeric kernels of the analysis scripts.
+
+The analysis scripts run as a short-lived process per request, so they do not
+JIT-compile their kernels by default (see _jit.py). Run this once at
+install/packaging time - and again after editing a kernel - to build the
+extensions next to the scripts:
+
+    python python_backend/build_kernels.py
+
+Each extension embeds a fingerprint of the kernel code it was built from, and
+a stale extension is ignored (with a warning) until it is rebuilt.
+"""
+import importlib
+import os
+import sys
+
+from numba.pycc import CC
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+import _jit  # noqa: E402
+
+# extension -> (module defining the kernels, [(kernel name, signature)])
+EXTENSIONS = {
+    '_indicators_aot': ('analyze_pair', [
+        ('_rsi_last', 'f8(f8[:], i8)'),
+        ('_stoch_last', 'f8(f8[:], f8[:], f8[:], i8)'),
+        ('_ewm', 'f8[:](f8[:], f8)'),
+        ('_keltner_last', 'UniTuple(f8, 3)(f8[:], f8[:], f8[:], i8)'),
+    ]),
+    '_kernels_aot': ('_kernels', [
+        ('ema', 'f8[:](f8[:], i8)'),
+    ]),
+}
+
+def build(extension):
+    """Compile one extension from the current kernel code and return its path"""
+    module_name, signatures = EXTENSIONS[extension]
+
+    # Block an existing build so the module keeps its Python kernels to compile from
+    sys.modules[extension] = None
+    module = importlib.import_module(module_name)
+    kernels = [getattr(module, name) for name, _ in signatures]
+
+    cc = CC(extension)
+    cc.output_dir = BACKEND_DIR
+    for (name, signature), kernel in zip(signatures, kernels):
+        cc.export(name, signature)(_jit.py_func(kernel))
+
+    # A constant function recording which kernel code this build came from
+    namespace = {}
+    exec(f"def kernel_fingerprint():\n    return {_jit.kernel_fingerprint(kernels)}\n", namespace)
+    cc.export('kernel_fingerprint', 'i8()')(namespace['kernel_fingerprint'])
+
+    cc.compile()
+    return cc.output_file
+
+if __name__ == '__main__':
+    for extension in EXTENSIONS:
+        print(f"Built {build(extension)} in {BACKEND_DIR}")
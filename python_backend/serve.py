@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Persistent worker for analyze_pair.py and analyze_pair_dev.py.
+
+Every analysis normally runs as a fresh python3 process, so each request pays
+interpreter start-up plus the pandas/numpy imports before any analysis
+happens. This worker imports the analysis modules once - with the numba JIT
+enabled unless ANALYZE_JIT is set otherwise, since the compile cost is paid
+only once here - and answers requests over a per-user Unix domain socket:
+
+    python python_backend/serve.py
+
+While it is running, `python3 analyze_pair.py PAIR [TIMEFRAME]` (and the dev
+script) forward the request here before importing anything heavy, and print
+the reply exactly as the inline run would. Without a worker (or if the socket
+is not one this user owns) the scripts run inline as before.
+
+Protocol - one JSON line each way per connection:
+    request: {"script": "analyze_pair", "pair": "BTCUSDT", "timeframe": "15m"}
+    reply:   {"exit_code": 0, "stream": "stdout", "output": "<response JSON>"}
+"""
+import importlib
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import time
+import traceback
+
+SOCKET_PATH = f'/tmp/analyze-{os.getuid()}.sock'
+SCRIPTS = ('analyze_pair', 'analyze_pair_dev')
+MAX_REQUEST_BYTES = 4096
+CONNECT_TIMEOUT = 0.5  # seconds - a missing worker must not delay the inline fallback
+REPLY_TIMEOUT = 60  # seconds - the live analysis waits on CoinGecko
+CONNECT_RETRY_DELAY = 0.01  # seconds between connects while the worker's backlog is full
+REQUEST_QUEUE_SIZE = 128  # pending connections the worker accepts before clients have to retry
+
+def _is_own_socket(path):
+    """Check that path is a socket owned by this user, so requests never go to another user's listener"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+def _connect(path):
+    """Connect to the worker socket, retrying for up to CONNECT_TIMEOUT while its backlog is full"""
+    deadline = time.monotonic() + CONNECT_TIMEOUT
+    while True:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(CONNECT_TIMEOUT)
+            # A full AF_UNIX backlog fails a connect with a timeout set at once (EAGAIN) instead of waiting
+            sock.connect(path)
+            return sock
+        except BlockingIOError:
+            sock.close()
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(CONNECT_RETRY_DELAY)
+        except BaseException:
+            sock.close()
+            raise
+
+def request(script, pair, timeframe):
+    """Run one analysis on the worker; returns the decoded reply, or None when no worker answers"""
+    if not _is_own_socket(SOCKET_PATH):
+        return None
+    try:
+        with _connect(SOCKET_PATH) as sock:
+            sock.settimeout(REPLY_TIMEOUT)
+            payload = {'script': script, 'pair': pair, 'timeframe': timeframe}
+            sock.sendall(json.dumps(payload).encode() + b'\n')
+            with sock.makefile('rb') as reply:
+                line = reply.readline()
+    except OSError:
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None  # Garbled or empty reply - run inline instead
+
+def run_cli(script):
+    """Answer a command-line run of script through the worker and exit; returns if no worker is available"""
+    if len(sys.argv) < 2:
+        return  # Let the script report the missing argument itself
+
+    pair = sys.argv[1].upper()
+    timeframe = sys.argv[2] if len(sys.argv) > 2 else '15m'
+    reply = request(script, pair, timeframe)
+    try:
+        exit_code, stream, output = reply['exit_code'], reply['stream'], reply['output']
+        stream = {'stdout': sys.stdout, 'stderr': sys.stderr}[stream]
+    except (TypeError, KeyError):
+        return  # No worker or an unexpected reply - run inline instead
+
+    # Same streams and exit code as the inline run (see _serialize.cli_response)
+    print(output, file=stream)
+    sys.exit(exit_code)
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handle one JSON request line per connection"""
+
+    def handle(self):
+        line = self.rfile.readline(MAX_REQUEST_BYTES)
+        if not line:
+            return  # A connect-only probe from _worker_running
+
+        try:
+            req = json.loads(line)
+            module = self.server.modules[req['script']]
+            pair = req['pair']
+            timeframe = req.get('timeframe', '15m')
+            if not isinstance(pair, str) or not pair:
+                raise ValueError('pair must be a non-empty string')
+            if not isinstance(timeframe, str):
+                raise ValueError('timeframe must be a string')
+        except (ValueError, KeyError, TypeError) as e:
+            exit_code, stream, output = 1, 'stderr', json.dumps({'error': f'Invalid request: {str(e)}'})
+        else:
+            # Imported here so the client side of this module stays free of numpy
+            from _serialize import cli_response
+
+            def run(pair, timeframe):
+                try:
+                    return module.handle(pair, timeframe)
+                except Exception:
+                    traceback.print_exc()  # Keep the traceback in the worker's log
+                    raise
+
+            exit_code, stream, output = cli_response(run, pair.upper(), timeframe)
+
+        reply = {'exit_code': exit_code, 'stream': stream, 'output': output}
+        self.wfile.write(json.dumps(reply).encode() + b'\n')
+
+class _WorkerServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+def _worker_running(path):
+    """Check whether another worker is already listening on path"""
+    if not _is_own_socket(path):
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+    return True
+
+def serve(path=SOCKET_PATH):
+    """Import the analysis modules once and serve requests until interrupted"""
+    if os.path.lexists(path) and not _is_own_socket(path):
+        print(f"{path} exists and is not a socket owned by this user", file=sys.stderr)
+        sys.exit(1)
+    if _worker_running(path):
+        print(f"An analysis worker is already listening on {path}", file=sys.stderr)
+        sys.exit(1)
+
+    # The JIT compile cost is paid once per worker, so enable it unless told otherwise
+    os.environ.setdefault('ANALYZE_JIT', '1')
+    modules = {name: importlib.import_module(name) for name in SCRIPTS}
+
+    # Remove a stale socket left by a worker that did not shut down cleanly
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+    old_umask = os.umask(0o177)  # Only this user may connect
+    try:
+        server = _WorkerServer(path, _RequestHandler)
+    finally:
+        os.umask(old_umask)
+    server.modules = modules
+
+    # Treat SIGTERM like Ctrl-C so the socket file is removed on shutdown
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    print(f"Analysis worker listening on {path}", file=sys.stderr)
+    try:
+        with server:
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os.unlink(path)
+
+if __name__ == '__main__':
+    serve()